@@ -1,12 +1,14 @@
 import sys
-import json
-from typing import Any, Dict, List, Optional, Callable
+from typing import Any, Callable, Dict, Iterable, List, Optional
 
 from openai import OpenAI, APIError
 
+from .history import MessageStore, ToolCallRecord
 from .prompts import load_strongest_system_prompt
-from .config import get_openai_api_key, get_openai_base_url, get_model_id
-from ..tools.registry import get_tool_specs, handle_tool_call, get_available_tool_names
+from .routing import ModelRouter
+from .config import get_openai_api_key, get_openai_base_url, get_model_id, get_watch_enabled
+from ..tools.registry import DEFAULT_REGISTRY, ToolContext, ToolRegistry, ToolResult
+from ..tools.watcher import ChangeWatcher
 
 
 class OttoAgent:
@@ -17,6 +19,7 @@ class OttoAgent:
         extra_tools: Optional[List[Dict[str, Any]]] = None,
         extra_tool_handler: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None,
         extra_tool_handlers: Optional[Dict[str, Callable[[Dict[str, Any]], Dict[str, Any]]]] = None,
+        registry: Optional[ToolRegistry] = None,
     ) -> None:
         key = api_key or get_openai_api_key()
         if not key:
@@ -27,36 +30,66 @@ class OttoAgent:
         else:
             self.client = OpenAI(api_key=key)
         self.model = get_model_id()
+        # Sends routine steps to OTTO_FAST_MODEL when configured; self.model stays the main model
+        self.router = ModelRouter.from_env(self.model)
         self.system_prompt = load_strongest_system_prompt()
-        # Default tools
-        self.tools = get_tool_specs()
+        # Built-in tools, or a caller-supplied registry (e.g. DEFAULT_REGISTRY.copy() plus registrations)
+        self.registry = registry or DEFAULT_REGISTRY
+        self.tools = self.registry.specs()
         # Optional additional tools (specs follow OpenAI tool JSON)
         if extra_tools:
             self.tools = self.tools + list(extra_tools)
         # Optional handlers for extra tools; called when builtin handler doesn't recognize tool
         self.extra_tool_handler = extra_tool_handler
         self.extra_tool_handlers = extra_tool_handlers or {}
-        self.history: List[Dict[str, Any]] = [
-            {"role": "system", "content": self.system_prompt}
-        ]
+        # Per-session tool state, e.g. what has already been read so re-reads can be diffs
+        self.tool_context = ToolContext()
+        self.file_tracker = self.tool_context.file_tracker
+        # Reports on-disk changes to files it has read or written, e.g. by shell commands or other editors
+        self.watcher = ChangeWatcher(self.file_tracker) if get_watch_enabled() else None
+        # Compact message records; serialized to OpenAI message dicts only when sent
+        self.history = MessageStore()
+        self.history.append({"role": "system", "content": self.system_prompt})
+
+    @property
+    def history(self) -> MessageStore:
+        return self._history
+
+    @history.setter
+    def history(self, messages: Iterable[Any]) -> None:
+        # Accepts plain lists too (e.g. ``agent.history = agent.history.to_openai()[:1]``)
+        self._history = messages if isinstance(messages, MessageStore) else MessageStore(messages=messages)
 
     def prompt(self, text: str, verbose: bool = False) -> Dict[str, Any]:
         self.history.append({"role": "user", "content": text})
         step_logs: List[Dict[str, Any]] = []
+        escalate: Optional[str] = None
 
         while True:
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.history,
-                tools=self.tools,
-                tool_choice="auto",
-                stream=True,
-            )
+            if self.watcher:
+                notice = self.watcher.notice()
+                if notice:
+                    if verbose:
+                        print(notice)
+                    self.history.append({"role": "user", "content": notice})
+            route = self.router.choose(self.history, escalate=escalate)
+            escalate = None
+            if verbose and self.router.enabled:
+                print(f"[route] {route.model} ({route.reason})")
 
             assistant_text_chunks: List[str] = []
             acc_tool_calls: Dict[int, Dict[str, Any]] = {}
+            # A fast-model draft may be discarded for the main model's answer, so don't stream it
+            stream_text = verbose and not (route.tier == "fast" and self.router.escalate_final)
 
             try:
+                stream = self.client.chat.completions.create(
+                    model=route.model,
+                    messages=self.history.to_openai(),
+                    tools=self.tools,
+                    tool_choice="auto",
+                    stream=True,
+                )
                 for event in stream:
                     choice = event.choices[0]
                     delta = choice.delta
@@ -65,7 +98,7 @@ class OttoAgent:
                     content = getattr(delta, "content", None)
                     if content:
                         assistant_text_chunks.append(content)
-                        if verbose:
+                        if stream_text:
                             sys.stdout.write(content)
                             sys.stdout.flush()
                     tcs = getattr(delta, "tool_calls", None)
@@ -107,7 +140,7 @@ class OttoAgent:
                         print(f"Invalid tool call: The model attempted to use a tool called `{invalid_tool}` but it does not exist.")
 
                     # Add feedback to the model
-                    available_tools = get_available_tool_names()
+                    available_tools = self._session_tool_names()
                     feedback_message = f"The tool `{invalid_tool}` does not exist. Please use only the tools that are available to you in this session. The available tools are: {', '.join(f'`{t}`' for t in available_tools)}."
 
                     # Create a synthetic assistant message with feedback
@@ -118,6 +151,13 @@ class OttoAgent:
                     })
 
                     # Continue to next iteration instead of crashing
+                    escalate = "invalid tool call"
+                    continue
+                elif route.tier == "fast":
+                    # Retry the step on the main model rather than failing the prompt
+                    if verbose:
+                        print(f"[route] {route.model} failed: {error_msg}")
+                    escalate = "fast model error"
                     continue
                 else:
                     # Re-raise other API errors
@@ -139,12 +179,26 @@ class OttoAgent:
                 call["function"] = fn
                 finalized_calls.append(call)
 
-            # log this streamed step
+            # log this streamed step; the call records are shared with the history entry below
+            call_records = tuple(ToolCallRecord.from_dict(c) for c in finalized_calls)
             step_logs.append({
                 "assistant_text": "".join(assistant_text_chunks),
-                "tool_calls": finalized_calls,
+                "tool_calls": call_records,
+                "model": route.model,
+                "route": route.reason,
             })
 
+            if not finalized_calls and route.tier == "fast" and self.router.escalate_final:
+                # Final answers come from the main model; the fast model's draft is dropped
+                step_logs[-1]["escalated"] = True
+                if verbose:
+                    print(f"[route] escalating final answer to {self.router.main_model}")
+                escalate = "final answer"
+                continue
+            if verbose and not stream_text and assistant_text_chunks:
+                # Kept draft text that accompanied tool calls
+                print("".join(assistant_text_chunks))
+
             if finalized_calls:
                 # execute tools, append, and continue loop
                 tool_results = []
@@ -157,68 +211,41 @@ class OttoAgent:
                     # 1) Try extra explicit handler first (ensures custom tools work without registry knowledge)
                     tool_name = (call.get("function") or {}).get("name") or ""
                     handler = self.extra_tool_handlers.get(tool_name) if tool_name else None
-                    if not handler and self.extra_tool_handler:
-                        # fallback catch-all
-                        handler = self.extra_tool_handler
-
                     if handler:
-                        result = handler(call)
+                        result = ToolResult.from_message(handler(call))
                     else:
-                        # 2) Fallback to built-in registry
-                        result = handle_tool_call(call)
-
-                    # Detect unknown tool result from registry
-                    try:
-                        content = json.loads(result.get("content", "{}"))
-                        if isinstance(content, dict) and content.get('unknown_tool'):
-                            tool_name = content.get('tool_name', tool_name)
-                            if verbose:
-                                print(f"Invalid tool call: The model attempted to use a tool called `{tool_name}` but it does not exist.")
-                            unknown_tool_calls.append(tool_name)
-                            # If not previously handled, try custom handler now
-                            if not handler:
-                                handler = self.extra_tool_handlers.get(tool_name) if tool_name else None
-                                if handler:
-                                    result = handler(call)
-                                elif self.extra_tool_handler:
-                                    result = self.extra_tool_handler(call)
-                    except (json.JSONDecodeError, KeyError):
-                        pass
+                        # 2) Built-in registry, then the catch-all handler for anything it doesn't know
+                        result = self.registry.dispatch(call, self.tool_context)
+                        if result.unknown_tool:
+                            if self.extra_tool_handler:
+                                result = ToolResult.from_message(self.extra_tool_handler(call))
+                            else:
+                                if verbose:
+                                    print(f"Invalid tool call: The model attempted to use a tool called `{tool_name}` but it does not exist.")
+                                unknown_tool_calls.append(tool_name)
 
                     if verbose:
-                        preview = result.get("content", "")
+                        preview = result.to_message().get("content") or ""
                         print(f"[tool] result <- {preview[:500]}")
                     tool_results.append(result)
 
                 # If we had any unknown tool calls, provide feedback listing all tools in this session
                 if unknown_tool_calls:
-                    # Include both built-ins and this agent's extra tools
-                    builtin_names = get_available_tool_names()
-                    extra_names = []
-                    try:
-                        extra_names = [t.get("function", {}).get("name") for t in self.tools if t.get("function", {}).get("name")]
-                    except Exception:
-                        pass
-                    all_names = []
-                    seen = set()
-                    for n in (builtin_names + extra_names):
-                        if n and n not in seen:
-                            all_names.append(n)
-                            seen.add(n)
+                    all_names = self._session_tool_names()
                     feedback_message = f"The tool(s) {', '.join(f'`{t}`' for t in unknown_tool_calls)} do not exist. Please use only the tools that are available to you in this session. The available tools are: {', '.join(f'`{t}`' for t in all_names)}."
-                    tool_results.append({
-                        "role": "tool",
-                        "tool_call_id": f"unknown_tools_feedback_{len(self.history)}",
-                        "name": "system_feedback",
-                        "content": json.dumps({"ok": True, "feedback": feedback_message})
-                    })
+                    tool_results.append(ToolResult(
+                        f"unknown_tools_feedback_{len(self.history)}",
+                        "system_feedback",
+                        {"ok": True, "feedback": feedback_message},
+                    ))
                 self.history.append({
                     "role": "assistant",
-                    "tool_calls": finalized_calls,
+                    "tool_calls": call_records,
                     "content": None,
                 })
                 for r in tool_results:
-                    self.history.append(r)
+                    self.history.append(r.to_message())
+                self.history.compact()
                 continue
             else:
                 # no tool calls; finalize text and return
@@ -227,8 +254,24 @@ class OttoAgent:
                 return {
                     "ok": True,
                     "final_text": final_text,
-                    "steps": step_logs,
+                    "steps": [
+                        {**step, "tool_calls": [c.to_dict() for c in step["tool_calls"]]}
+                        for step in step_logs
+                    ],
                     "history_count": len(self.history),
                 }
 
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate memory held by this session's history, in bytes."""
+        return self.history.memory_usage()
 
+    def _session_tool_names(self) -> List[str]:
+        """Names of every tool offered in this session: registry tools plus extra_tools."""
+        names: List[str] = []
+        seen = set()
+        for t in self.tools:
+            n = (t.get("function") or {}).get("name")
+            if n and n not in seen:
+                names.append(n)
+                seen.add(n)
+        return names
@@ -1,13 +1,13 @@
 import sys
-import json
 from typing import Any, Dict, List
 
 from openai import APIError
 
 from ..core.openai_client import get_openai_client
 from ..core.prompts import load_strongest_system_prompt
-from ..core.config import get_model_id
-from ..tools.registry import get_tool_specs, handle_tool_call, get_available_tool_names
+from ..core.config import get_model_id, get_watch_enabled
+from ..tools.registry import DEFAULT_REGISTRY, ToolContext, ToolResult
+from ..tools.watcher import ChangeWatcher
 
 
 MODEL_ID = get_model_id()
@@ -16,7 +16,10 @@ MODEL_ID = get_model_id()
 def run_cli(verbose: bool = False) -> int:
     client = get_openai_client()
     system_prompt = load_strongest_system_prompt()
-    tools = get_tool_specs()
+    registry = DEFAULT_REGISTRY
+    tools = registry.specs()
+    tool_context = ToolContext()
+    watcher = ChangeWatcher(tool_context.file_tracker) if get_watch_enabled() else None
 
     print("Otto CLI — type your prompt. Ctrl-C to exit.")
     history: List[Dict[str, Any]] = [
@@ -36,6 +39,12 @@ def run_cli(verbose: bool = False) -> int:
 
         # Multi-step tool chain loop
         while True:
+            if watcher:
+                notice = watcher.notice()
+                if notice:
+                    if verbose:
+                        print(notice)
+                    history.append({"role": "user", "content": notice})
             # Stream a step
             stream = client.chat.completions.create(
                 model=MODEL_ID,
@@ -97,7 +106,7 @@ def run_cli(verbose: bool = False) -> int:
                     print(f"Invalid tool call: The model attempted to use a tool called `{invalid_tool}` but it does not exist.")
 
                     # Add feedback to the model
-                    available_tools = get_available_tool_names()
+                    available_tools = registry.names()
                     feedback_message = f"The tool `{invalid_tool}` does not exist. Please use only the tools that are available to you in this session. The available tools are: {', '.join(f'`{t}`' for t in available_tools)}."
 
                     # Create a synthetic tool result for the feedback
@@ -139,40 +148,35 @@ def run_cli(verbose: bool = False) -> int:
                 for call in finalized_calls:
                     if verbose:
                         print(f"[tool] call -> {call['function']['name']} args={call['function']['arguments']!r}")
-                    result = handle_tool_call(call)
+                    result = registry.dispatch(call, tool_context)
 
                     # Check if this is an unknown tool call
-                    try:
-                        content = json.loads(result['content'])
-                        if isinstance(content, dict) and content.get('unknown_tool'):
-                            tool_name = content.get('tool_name', call['function']['name'])
-                            print(f"Invalid tool call: The model attempted to use a tool called `{tool_name}` but it does not exist.")
-                            unknown_tool_calls.append(tool_name)
-                    except (json.JSONDecodeError, KeyError):
-                        pass
+                    if result.unknown_tool:
+                        tool_name = call['function']['name']
+                        print(f"Invalid tool call: The model attempted to use a tool called `{tool_name}` but it does not exist.")
+                        unknown_tool_calls.append(tool_name)
 
                     if verbose:
-                        print(f"[tool] result <- {result['content'][:500]}")
+                        print(f"[tool] result <- {result.to_message()['content'][:500]}")
                     tool_results.append(result)
 
                 # If we had any unknown tool calls, provide helpful feedback to the model
                 if unknown_tool_calls:
-                    available_tools = get_available_tool_names()
+                    available_tools = registry.names()
                     feedback_message = f"The tool(s) {', '.join(f'`{t}`' for t in unknown_tool_calls)} do not exist. Please use only the tools that are available to you in this session. The available tools are: {', '.join(f'`{t}`' for t in available_tools)}."
                     # Add this as a tool result so it appears in the conversation
-                    tool_results.append({
-                        "role": "tool",
-                        "tool_call_id": f"unknown_tools_feedback_{len(history)}",
-                        "name": "system_feedback",
-                        "content": json.dumps({"ok": True, "feedback": feedback_message})
-                    })
+                    tool_results.append(ToolResult(
+                        f"unknown_tools_feedback_{len(history)}",
+                        "system_feedback",
+                        {"ok": True, "feedback": feedback_message},
+                    ))
                 history.append({
                     "role": "assistant",
                     "tool_calls": finalized_calls,
                     "content": None,
                 })
                 for r in tool_results:
-                    history.append(r)
+                    history.append(r.to_message())
                 if verbose:
                     print("[turn] continuing after tool results\n")
                 continue
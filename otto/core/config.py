@@ -27,6 +27,37 @@ def get_model_id() -> str:
     return os.getenv("MODEL") or os.getenv("OTTO_MODEL") or "gpt-5-mini"
 
 
+def get_fast_model_id() -> Optional[str]:
+    """Get the optional faster/cheaper model used for routine steps."""
+    return os.getenv("FAST_MODEL") or os.getenv("OTTO_FAST_MODEL") or None
+
+
+def get_routing_enabled() -> bool:
+    """Whether per-step model routing is on; defaults to on when a fast model is configured."""
+    value = (os.getenv("OTTO_ROUTING") or "").strip().lower()
+    if value in ("0", "off", "false", "no"):
+        return False
+    return get_fast_model_id() is not None
+
+
+def get_route_small_result_chars() -> int:
+    """Largest combined tool-result size (in characters) that may still be followed up by the fast model."""
+    try:
+        return int(os.getenv("OTTO_ROUTE_SMALL_RESULT_CHARS") or 4000)
+    except ValueError:
+        return 4000
+
+
+def get_route_escalate_final() -> bool:
+    """Whether a final answer drafted by the fast model is regenerated by the main model."""
+    return (os.getenv("OTTO_ROUTE_ESCALATE_FINAL") or "1").strip().lower() not in ("0", "off", "false", "no")
+
+
+def get_watch_enabled() -> bool:
+    """Whether the agent polls previously-read files for external changes between steps."""
+    return (os.getenv("OTTO_WATCH") or "1").strip().lower() not in ("0", "off", "false", "no")
+
+
 def require_env_var(var_name: str) -> str:
     """Get a required environment variable or raise an error."""
     value = os.getenv(var_name)
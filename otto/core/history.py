@@ -0,0 +1,215 @@
+"""Compact conversation history for long-lived or numerous agent sessions.
+
+Messages are slotted records rather than dicts, roles and tool names are
+interned, and tool calls are shared by reference between the history and the
+per-step logs. Tool outputs that have scrolled out of the recent window are
+zlib-compressed in place. The OpenAI ``messages`` list is built on demand.
+"""
+
+import sys
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, MutableSequence, Optional, Tuple
+
+
+# Messages within this many of the end of history are never compressed
+HOT_MESSAGES = 12
+# Tool outputs smaller than this are not worth compressing
+COMPRESS_MIN_BYTES = 1024
+
+_MISSING = object()
+
+
+class ToolCallRecord:
+    __slots__ = ("id", "type", "name", "arguments")
+
+    def __init__(self, id: str, type: str, name: str, arguments: str) -> None:
+        self.id = id
+        self.type = sys.intern(type)
+        self.name = sys.intern(name)
+        self.arguments = arguments
+
+    @classmethod
+    def from_dict(cls, call: Dict[str, Any]) -> "ToolCallRecord":
+        fn = call.get("function") or {}
+        return cls(call.get("id") or "", call.get("type") or "function", fn.get("name") or "", fn.get("arguments") or "")
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"id": self.id, "type": self.type, "function": {"name": self.name, "arguments": self.arguments}}
+
+
+class Message:
+    __slots__ = ("role", "_content", "compressed", "tool_calls", "tool_call_id", "name")
+
+    def __init__(
+        self,
+        role: str,
+        content: Optional[str] = None,
+        tool_calls: Optional[Tuple[ToolCallRecord, ...]] = None,
+        tool_call_id: Optional[str] = None,
+        name: Optional[str] = None,
+    ) -> None:
+        self.role = sys.intern(role)
+        self._content: Any = content
+        self.compressed = False
+        self.tool_calls = tool_calls
+        self.tool_call_id = tool_call_id
+        self.name = sys.intern(name) if name else name
+
+    @classmethod
+    def from_dict(cls, message: Dict[str, Any]) -> "Message":
+        calls = message.get("tool_calls")
+        return cls(
+            message.get("role") or "user",
+            message.get("content"),
+            tuple(c if isinstance(c, ToolCallRecord) else ToolCallRecord.from_dict(c) for c in calls) if calls is not None else None,
+            message.get("tool_call_id"),
+            message.get("name"),
+        )
+
+    @property
+    def content(self) -> Optional[str]:
+        if self.compressed:
+            return zlib.decompress(self._content).decode("utf-8")
+        return self._content
+
+    def compress(self) -> bool:
+        if self.compressed or not isinstance(self._content, str):
+            return False
+        raw = self._content.encode("utf-8")
+        if len(raw) < COMPRESS_MIN_BYTES:
+            return False
+        packed = zlib.compress(raw)
+        if len(packed) >= len(raw):
+            return False
+        self._content = packed
+        self.compressed = True
+        return True
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style read access, for code that treats history entries as OpenAI message dicts."""
+        if key == "content":
+            return self.content
+        if key == "tool_calls":
+            return [c.to_dict() for c in self.tool_calls] if self.tool_calls is not None else default
+        if key in ("role", "tool_call_id", "name"):
+            value = getattr(self, key)
+            return default if value is None else value
+        return default
+
+    def __getitem__(self, key: str) -> Any:
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __contains__(self, key: object) -> bool:
+        return isinstance(key, str) and self.get(key, _MISSING) is not _MISSING
+
+    def to_openai(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"role": self.role, "content": self.content}
+        if self.tool_calls is not None:
+            out["tool_calls"] = [c.to_dict() for c in self.tool_calls]
+        if self.tool_call_id is not None:
+            out["tool_call_id"] = self.tool_call_id
+        if self.name is not None:
+            out["name"] = self.name
+        return out
+
+
+def _as_message(message: Any) -> Message:
+    return message if isinstance(message, Message) else Message.from_dict(message)
+
+
+class MessageStore(MutableSequence[Message]):
+    """A list of :class:`Message` that also accepts OpenAI message dicts.
+
+    Dicts are converted on the way in, and slicing returns another store, so
+    trimming with ``store[:1]`` or ``del store[1:]`` keeps a usable history.
+    """
+
+    def __init__(self, hot_messages: int = HOT_MESSAGES, messages: Iterable[Any] = ()) -> None:
+        self.hot_messages = hot_messages
+        self._messages: List[Message] = [_as_message(m) for m in messages]
+        # Everything before this index has already been considered for compression
+        self._cold_upto = 0
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def __getitem__(self, index):  # type: ignore[override]
+        if isinstance(index, slice):
+            return MessageStore(self.hot_messages, self._messages[index])
+        return self._messages[index]
+
+    def __setitem__(self, index, value) -> None:  # type: ignore[override]
+        if isinstance(index, slice):
+            self._messages[index] = [_as_message(m) for m in value]
+        else:
+            self._messages[index] = _as_message(value)
+        self._touched(index)
+
+    def __delitem__(self, index) -> None:  # type: ignore[override]
+        del self._messages[index]
+        self._touched(index)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._messages)
+
+    def _touched(self, index: Any) -> None:
+        # Messages from the first changed position on may not have been considered yet
+        if isinstance(index, slice):
+            first = index.indices(len(self._messages))[0] if index.step in (None, 1) else 0
+        else:
+            first = index if index >= 0 else max(len(self._messages) + index, 0)
+        self._cold_upto = min(self._cold_upto, first)
+
+    def insert(self, index: int, message: Any) -> None:
+        self._messages.insert(index, _as_message(message))
+        self._touched(index)
+
+    def append(self, message: Any) -> None:
+        self._messages.append(_as_message(message))
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._cold_upto = 0
+
+    def compact(self) -> int:
+        """Compress tool outputs that have left the hot window. Returns how many were compressed."""
+        end = len(self._messages) - self.hot_messages
+        count = 0
+        for message in self._messages[self._cold_upto : max(end, 0)]:
+            if message.role == "tool" and message.compress():
+                count += 1
+        self._cold_upto = max(self._cold_upto, end)
+        return count
+
+    def to_openai(self) -> List[Dict[str, Any]]:
+        return [m.to_openai() for m in self._messages]
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held by this session's history."""
+        total = sys.getsizeof(self._messages)
+        payload = compressed_bytes = compressed = 0
+        for m in self._messages:
+            total += sys.getsizeof(m)
+            if m._content is not None:
+                size = sys.getsizeof(m._content)
+                payload += size
+                if m.compressed:
+                    compressed += 1
+                    compressed_bytes += size
+            if m.tool_call_id is not None:
+                total += sys.getsizeof(m.tool_call_id)
+            if m.tool_calls is not None:
+                total += sys.getsizeof(m.tool_calls)
+                for c in m.tool_calls:
+                    # name and type are interned and shared, so only count per-call strings
+                    total += sys.getsizeof(c) + sys.getsizeof(c.id) + sys.getsizeof(c.arguments)
+        return {
+            "messages": len(self._messages),
+            "compressed_messages": compressed,
+            "payload_bytes": payload,
+            "compressed_payload_bytes": compressed_bytes,
+            "total_bytes": total + payload,
+        }
@@ -1,6 +1,9 @@
+from functools import lru_cache
 from pathlib import Path
 
 
+# Read once per process, so every session's history shares one prompt string
+@lru_cache(maxsize=None)
 def load_strongest_system_prompt() -> str:
     # Prefer packaged prompts in otto/prompts
     roots = [
@@ -0,0 +1,82 @@
+"""Per-step model routing between the main model and an optional fast model."""
+
+import json
+from dataclasses import dataclass
+from typing import Any, List, Optional, Sequence
+
+from .config import (
+    get_fast_model_id,
+    get_route_escalate_final,
+    get_route_small_result_chars,
+    get_routing_enabled,
+)
+
+
+@dataclass
+class RouteDecision:
+    model: str
+    tier: str  # "main" or "fast"
+    reason: str
+
+
+class ModelRouter:
+    """Pick the model for each step of a prompt.
+
+    Routine follow-ups to small, successful tool results go to the fast model.
+    New user requests, steps after a tool or API failure, and final answers
+    (when ``escalate_final`` is set) go to the main model.
+    """
+
+    def __init__(
+        self,
+        main_model: str,
+        fast_model: Optional[str] = None,
+        small_result_chars: int = 4000,
+        escalate_final: bool = True,
+    ) -> None:
+        self.main_model = main_model
+        self.fast_model = fast_model
+        self.small_result_chars = small_result_chars
+        self.escalate_final = escalate_final
+
+    @classmethod
+    def from_env(cls, main_model: str) -> "ModelRouter":
+        return cls(
+            main_model,
+            fast_model=get_fast_model_id() if get_routing_enabled() else None,
+            small_result_chars=get_route_small_result_chars(),
+            escalate_final=get_route_escalate_final(),
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.fast_model) and self.fast_model != self.main_model
+
+    def main(self, reason: str) -> RouteDecision:
+        return RouteDecision(self.main_model, "main", reason)
+
+    def choose(self, history: Sequence[Any], escalate: Optional[str] = None) -> RouteDecision:
+        """Route the next step; ``escalate`` names a reason to force the main model."""
+        if not self.enabled:
+            return self.main("routing disabled")
+        if escalate:
+            return self.main(escalate)
+        if not history or history[-1].get("role") != "tool":
+            return self.main("new request")
+
+        # Tool results of the last step sit after the assistant message that requested them
+        results: List[str] = []
+        for message in reversed(history):
+            if message.get("role") != "tool":
+                break
+            results.append(message.get("content") or "")
+        if sum(len(r) for r in results) > self.small_result_chars:
+            return self.main("large tool result")
+        for content in results:
+            try:
+                data = json.loads(content)
+            except ValueError:
+                continue
+            if isinstance(data, dict) and data.get("ok") is False:
+                return self.main("tool failure")
+        return RouteDecision(self.fast_model or self.main_model, "fast", "small tool result")
@@ -1,5 +1,21 @@
-from .registry import get_tool_specs, handle_tool_call
-
-__all__ = ["get_tool_specs", "handle_tool_call"]
-
+from .registry import (
+    DEFAULT_REGISTRY,
+    Tool,
+    ToolContext,
+    ToolRegistry,
+    ToolResult,
+    ToolSpec,
+    get_tool_specs,
+    handle_tool_call,
+)
 
+__all__ = [
+    "DEFAULT_REGISTRY",
+    "Tool",
+    "ToolContext",
+    "ToolRegistry",
+    "ToolResult",
+    "ToolSpec",
+    "get_tool_specs",
+    "handle_tool_call",
+]
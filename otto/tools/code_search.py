@@ -0,0 +1,370 @@
+"""Local lexical code search: a BM25 inverted index over workspace code chunks.
+
+One index is kept per git repository (or per searched directory outside a
+repo), persisted under ``.otto/`` at its root. That directory carries its own
+``.gitignore`` so it never shows up in ``git status``. The index is refreshed
+incrementally: only files whose size or mtime changed since the last search are
+re-chunked, and only their postings and per-file shards are replaced. Searching
+a subdirectory reuses the repository index and filters results to that subtree. Everything runs locally with the standard library.
+"""
+
+import hashlib
+import json
+import math
+import os
+import re
+import threading
+import zlib
+from collections import Counter
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from .ignore import IgnoreRules, find_repo_root
+
+
+# Bumped when the on-disk format changes; shards of other versions live in other directories
+INDEX_VERSION = 3
+INDEX_DIR = ".otto"
+INDEX_SHARDS = f"codebase_index.v{INDEX_VERSION}"
+# Single-file index written by version 2 and earlier, removed on first save
+LEGACY_INDEX_FILE = "codebase_index.json"
+
+CHUNK_LINES = 40
+CHUNK_OVERLAP = 10
+MAX_FILE_BYTES = 1_000_000
+SNIPPET_MAX_LINES = 12
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_BINARY_SUFFIXES = {
+    ".png", ".jpg", ".jpeg", ".gif", ".ico", ".pdf", ".zip", ".gz", ".tar", ".whl",
+    ".so", ".dll", ".dylib", ".exe", ".bin", ".pyc", ".o", ".a", ".class", ".jar",
+    ".woff", ".woff2", ".ttf", ".mp3", ".mp4", ".db", ".sqlite",
+}
+
+# Credential artifacts, never indexed or persisted. Matched by exact name or by
+# extension only, so source files such as secret_store.py or credentials.py stay
+# searchable. Dotfiles (.env, .npmrc, ...) are skipped wholesale.
+_SECRET_NAMES = frozenset({
+    "credentials.json", "credentials.yml", "credentials.yaml", "secrets.json",
+    "secrets.yml", "secrets.yaml", "secrets.toml", "id_rsa", "id_dsa", "id_ecdsa",
+    "id_ed25519",
+})
+_SECRET_SUFFIXES = frozenset({".pem", ".key", ".p12", ".pfx", ".keystore", ".jks", ".tfvars", ".env"})
+
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+")
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Split text into search terms, breaking identifiers on camelCase and snake_case.
+
+    The whole identifier is kept as a term as well as its parts, so exact
+    identifier queries still rank above partial matches.
+    """
+    terms: List[str] = []
+    for word in _WORD_RE.findall(text):
+        lowered = word.lower()
+        parts = [p.lower() for piece in word.split("_") if piece for p in _CAMEL_RE.findall(piece)]
+        if len(parts) != 1 or parts[0] != lowered:
+            terms.append(lowered)
+        terms.extend(p for p in parts if len(p) > 1 or p.isdigit())
+    return terms
+
+
+def _iter_source_files(root: Path):
+    rules = IgnoreRules.for_path(root)
+    for dirpath, dirnames, filenames in os.walk(root):
+        directory = Path(dirpath)
+        rules.load_dir(directory)
+        base = rules.rel(directory)
+        base = "" if base == "." else base + "/"
+        dirnames[:] = [
+            d for d in dirnames
+            if not d.startswith(".") and not rules.is_ignored(base + d, True)
+        ]
+        for fname in filenames:
+            suffix = Path(fname).suffix.lower()
+            if fname.startswith(".") or suffix in _BINARY_SUFFIXES:
+                continue
+            if fname.lower() in _SECRET_NAMES or suffix in _SECRET_SUFFIXES:
+                continue
+            if rules.is_ignored(base + fname, False):
+                continue
+            yield directory / fname
+
+
+def _read_text(path: Path) -> Optional[str]:
+    try:
+        data = path.read_bytes()
+    except OSError:
+        return None
+    if b"\x00" in data[:8192]:
+        return None
+    return data.decode("utf-8", errors="replace")
+
+
+def _chunk_file(text: str) -> Tuple[List[Tuple[int, int, int]], List[Dict[str, int]]]:
+    """Split into overlapping windows: ``(start, end, length)`` per chunk and its term frequencies."""
+    lines = text.splitlines()
+    chunks: List[Tuple[int, int, int]] = []
+    terms: List[Dict[str, int]] = []
+    step = CHUNK_LINES - CHUNK_OVERLAP
+    for start in range(0, max(len(lines), 1), step):
+        window = lines[start : start + CHUNK_LINES]
+        tf = Counter(tokenize("\n".join(window)))
+        if tf:
+            chunks.append((start + 1, start + len(window), sum(tf.values())))
+            terms.append(dict(tf))
+        if start + CHUNK_LINES >= len(lines):
+            break
+    return chunks, terms
+
+
+class _FileEntry:
+    __slots__ = ("mtime_ns", "size", "chunks", "postings")
+
+    def __init__(
+        self,
+        mtime_ns: int,
+        size: int,
+        chunks: List[Tuple[int, int, int]],
+        postings: Dict[str, List[int]],
+    ) -> None:
+        self.mtime_ns = mtime_ns
+        self.size = size
+        # (start line, end line, token count) per chunk
+        self.chunks = chunks
+        # term -> flat [chunk index, tf, chunk index, tf, ...]
+        self.postings = postings
+
+
+def _file_postings(terms: List[Dict[str, int]]) -> Dict[str, List[int]]:
+    postings: Dict[str, List[int]] = {}
+    for i, chunk_terms in enumerate(terms):
+        for term, tf in chunk_terms.items():
+            hits = postings.get(term)
+            if hits is None:
+                postings[term] = [i, tf]
+            else:
+                hits.append(i)
+                hits.append(tf)
+    return postings
+
+
+def _shard_name(rel: str) -> str:
+    return hashlib.sha1(rel.encode("utf-8", errors="surrogatepass")).hexdigest() + ".z"
+
+
+def _encode_shard(rel: str, entry: _FileEntry) -> bytes:
+    payload = [
+        rel, entry.mtime_ns, entry.size, [list(c) for c in entry.chunks],
+        list(entry.postings), list(entry.postings.values()),
+    ]
+    return zlib.compress(json.dumps(payload, separators=(",", ":")).encode("utf-8"))
+
+
+def _decode_shard(data: bytes) -> Tuple[str, _FileEntry]:
+    rel, mtime_ns, size, chunks, terms, hits = json.loads(zlib.decompress(data).decode("utf-8"))
+    chunk_spans = [(c[0], c[1], c[2]) for c in chunks]
+    return rel, _FileEntry(mtime_ns, size, chunk_spans, dict(zip(terms, hits)))
+
+
+class CodeSearchIndex:
+    """BM25 index over fixed-size, overlapping line windows of workspace files.
+
+    Postings are held and persisted per file (one compressed shard each), with a
+    shared document-frequency table, so a one-file edit costs one re-chunk, one
+    small write and no rebuild of the other files' postings. Indexes are shared
+    across sessions and threads; hold :attr:`lock` around :meth:`update` and
+    :meth:`search`.
+    """
+
+    def __init__(self, root: Path) -> None:
+        self.root = root.resolve()
+        self.shard_dir = self.root / INDEX_DIR / INDEX_SHARDS
+        self.lock = threading.Lock()
+        self.files: Dict[str, _FileEntry] = {}
+        # term -> number of chunks containing it, across all files
+        self._df: Dict[str, int] = {}
+        self._n_chunks = 0
+        self._total_length = 0
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            names = os.listdir(self.shard_dir)
+        except OSError:
+            return
+        for name in names:
+            if not name.endswith(".z"):
+                continue
+            try:
+                rel, entry = _decode_shard((self.shard_dir / name).read_bytes())
+            except (OSError, ValueError, zlib.error):
+                continue
+            self._add(rel, entry)
+
+    def _ensure_dir(self) -> None:
+        self.shard_dir.mkdir(parents=True, exist_ok=True)
+        # Self-ignoring, like .pytest_cache, so the index never shows up as untracked
+        gitignore = self.shard_dir.parent / ".gitignore"
+        if not gitignore.exists():
+            gitignore.write_text("# Created by otto automatically.\n*\n", encoding="utf-8")
+        legacy = self.shard_dir.parent / LEGACY_INDEX_FILE
+        if legacy.exists():
+            legacy.unlink()
+
+    def _save_file(self, rel: str, entry: _FileEntry) -> None:
+        try:
+            self._ensure_dir()
+            target = self.shard_dir / _shard_name(rel)
+            tmp = target.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_bytes(_encode_shard(rel, entry))
+            os.replace(tmp, target)
+        except OSError:
+            # A read-only workspace still gets an in-memory index
+            pass
+
+    def _delete_file(self, rel: str) -> None:
+        try:
+            (self.shard_dir / _shard_name(rel)).unlink()
+        except OSError:
+            pass
+
+    def _add(self, rel: str, entry: _FileEntry) -> None:
+        df = self._df
+        for term, hits in entry.postings.items():
+            df[term] = df.get(term, 0) + len(hits) // 2
+        self._n_chunks += len(entry.chunks)
+        self._total_length += sum(c[2] for c in entry.chunks)
+        self.files[rel] = entry
+
+    def _remove(self, rel: str) -> None:
+        entry = self.files.pop(rel, None)
+        if entry is None:
+            return
+        df = self._df
+        for term, hits in entry.postings.items():
+            remaining = df[term] - len(hits) // 2
+            if remaining:
+                df[term] = remaining
+            else:
+                del df[term]
+        self._n_chunks -= len(entry.chunks)
+        self._total_length -= sum(c[2] for c in entry.chunks)
+
+    def update(self) -> int:
+        """Re-index new or modified files and drop deleted ones. Returns the number of files touched."""
+        seen = set()
+        changed = 0
+        for path in _iter_source_files(self.root):
+            rel = path.relative_to(self.root).as_posix()
+            try:
+                st = path.stat()
+            except OSError:
+                continue
+            if st.st_size > MAX_FILE_BYTES:
+                continue
+            seen.add(rel)
+            entry = self.files.get(rel)
+            if entry and entry.mtime_ns == st.st_mtime_ns and entry.size == st.st_size:
+                continue
+            text = _read_text(path)
+            if text is None:
+                continue
+            chunks, terms = _chunk_file(text)
+            entry = _FileEntry(st.st_mtime_ns, st.st_size, chunks, _file_postings(terms))
+            self._remove(rel)
+            self._add(rel, entry)
+            self._save_file(rel, entry)
+            changed += 1
+        for rel in [r for r in self.files if r not in seen]:
+            self._remove(rel)
+            self._delete_file(rel)
+            changed += 1
+        return changed
+
+    def search(self, query: str, limit: int = 10, scope: str = "") -> List[Dict[str, Any]]:
+        """Rank chunks for ``query``; ``scope`` limits results to a path (relative to the root) and below."""
+        idf: Dict[str, float] = {}
+        for term in set(tokenize(query)):
+            df = self._df.get(term)
+            if df:
+                idf[term] = math.log(1 + (self._n_chunks - df + 0.5) / (df + 0.5))
+        if not idf:
+            return []
+        avg_len = self._total_length / self._n_chunks
+
+        scores: Dict[Tuple[str, int], float] = {}
+        for rel, entry in self.files.items():
+            if scope and rel != scope and not rel.startswith(scope + "/"):
+                continue
+            for term, weight in idf.items():
+                hits = entry.postings.get(term)
+                if not hits:
+                    continue
+                for i, tf in zip(hits[::2], hits[1::2]):
+                    norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * entry.chunks[i][2] / avg_len)
+                    scores[(rel, i)] = scores.get((rel, i), 0.0) + weight * tf * (BM25_K1 + 1) / norm
+
+        ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+        results: List[Dict[str, Any]] = []
+        per_file: Counter = Counter()
+        for (rel, i), score in ranked:
+            # Overlapping windows of one file tend to crowd out everything else
+            if per_file[rel] >= 2:
+                continue
+            per_file[rel] += 1
+            start, lines = self._snippet(rel, self.files[rel].chunks[i], set(idf))
+            results.append({
+                "path": rel,
+                "start": start,
+                "end": start + max(len(lines) - 1, 0),
+                "score": round(score, 3),
+                "snippet": "\n".join(lines),
+            })
+            if len(results) >= limit:
+                break
+        return results
+
+    def _snippet(self, rel: str, chunk: Tuple[int, int, int], terms: set) -> Tuple[int, List[str]]:
+        first, last = chunk[0], chunk[1]
+        text = _read_text(self.root / rel) or ""
+        lines = text.splitlines()[first - 1 : last]
+        if len(lines) <= SNIPPET_MAX_LINES:
+            return first, lines
+        # Centre the snippet on the line with the most query-term hits
+        hits = [sum(1 for t in tokenize(line) if t in terms) for line in lines]
+        best = max(range(len(lines)), key=lambda i: hits[i])
+        lo = max(0, min(best - SNIPPET_MAX_LINES // 2, len(lines) - SNIPPET_MAX_LINES))
+        return first + lo, lines[lo : lo + SNIPPET_MAX_LINES]
+
+
+_INDEXES: Dict[Path, CodeSearchIndex] = {}
+_INDEXES_LOCK = threading.Lock()
+
+
+def codebase_search(query: str, path: str = ".", limit: int = 10) -> Dict[str, Any]:
+    target = Path(path).resolve()
+    if not target.exists():
+        return {"ok": False, "error": f"no such file or directory: {path}"}
+    root = find_repo_root(target) or (target if target.is_dir() else target.parent)
+    with _INDEXES_LOCK:
+        index = _INDEXES.get(root)
+        if index is None:
+            index = _INDEXES[root] = CodeSearchIndex(root)
+    scope = target.relative_to(root).as_posix()
+    with index.lock:
+        index.update()
+        results = index.search(query, limit=limit, scope="" if scope == "." else scope)
+    # Report paths the way the model would pass them to read_file: relative to the CWD when possible
+    cwd = Path.cwd().resolve()
+    for r in results:
+        absolute = root / r["path"]
+        try:
+            r["path"] = absolute.relative_to(cwd).as_posix()
+        except ValueError:
+            r["path"] = str(absolute)
+    return {"ok": True, "query": query, "results": results}
@@ -0,0 +1,110 @@
+"""Per-session record of file contents the model has already seen.
+
+``read_file`` consults a :class:`FileTracker` so that a follow-up read of the same
+file can answer "unchanged" or send a unified diff instead of the full text.
+The tracker also keeps the on-disk state the agent last knew about, which
+:class:`~otto.tools.watcher.ChangeWatcher` polls for external edits.
+"""
+
+import difflib
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Send the full file instead of a diff once the diff stops being meaningfully smaller
+DIFF_MAX_RATIO = 0.6
+
+# A file modified this soon before we stat it may change again within the same
+# mtime tick, so its stat alone cannot prove it is unchanged (git's "racy" entries)
+RACY_WINDOW_NS = 2_000_000_000
+
+# (st_mtime_ns, st_size, sha256, racy)
+DiskState = Tuple[int, int, str, bool]
+
+
+def _lines(text: str):
+    lines = text.splitlines(keepends=True)
+    if lines and not lines[-1].endswith(("\n", "\r")):
+        lines[-1] += "\n"
+    return lines
+
+
+def text_digest(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8", errors="surrogatepass")).hexdigest()
+
+
+def disk_state(st: os.stat_result, digest: str) -> DiskState:
+    return (st.st_mtime_ns, st.st_size, digest, time.time_ns() - st.st_mtime_ns < RACY_WINDOW_NS)
+
+
+def unified_diff(label: str, old: str, new: str) -> str:
+    return "".join(difflib.unified_diff(_lines(old), _lines(new), fromfile=f"a/{label}", tofile=f"b/{label}"))
+
+
+class FileTracker:
+    def __init__(self) -> None:
+        # resolved path -> (sha256, text last shown to the model)
+        self._seen: Dict[str, Tuple[str, str]] = {}
+        # resolved path -> on-disk state last read or written by the agent, and that text
+        self._disk: Dict[str, DiskState] = {}
+        self._disk_text: Dict[str, str] = {}
+
+    @staticmethod
+    def _key(path: Path) -> str:
+        return str(path.resolve())
+
+    def remember(self, path: Path, text: str) -> None:
+        self._seen[self._key(path)] = (text_digest(text), text)
+
+    def forget(self, path: Path) -> None:
+        key = self._key(path)
+        self._seen.pop(key, None)
+        self._disk.pop(key, None)
+        self._disk_text.pop(key, None)
+
+    def last_seen(self, path: Path) -> Optional[str]:
+        entry = self._seen.get(self._key(path))
+        return entry[1] if entry else None
+
+    def record_disk(self, path: Path, text: Optional[str] = None) -> None:
+        """Note the current on-disk state of ``path`` as known to the agent (after a read or a write)."""
+        key = self._key(path)
+        try:
+            st = Path(key).stat()
+            if text is None:
+                text = Path(key).read_text(encoding="utf-8")
+        except (OSError, ValueError):
+            self._disk.pop(key, None)
+            self._disk_text.pop(key, None)
+            return
+        self.set_disk_state(key, disk_state(st, text_digest(text)), text)
+
+    def disk_states(self) -> List[Tuple[str, DiskState]]:
+        return list(self._disk.items())
+
+    def disk_text(self, key: str) -> Optional[str]:
+        """The contents the agent last knew to be on disk, i.e. as of its last read or write."""
+        return self._disk_text.get(key)
+
+    def set_disk_state(self, key: str, state: DiskState, text: str) -> None:
+        self._disk[key] = state
+        self._disk_text[key] = text
+
+    def read(self, path: Path, text: str, force_full: bool = False) -> Dict[str, Any]:
+        """Build a read_file result for ``text`` relative to what the model saw last."""
+        key = self._key(path)
+        digest = text_digest(text)
+        previous = self._seen.get(key)
+        self._seen[key] = (digest, text)
+        self.record_disk(path, text)
+        if force_full or previous is None:
+            return {"ok": True, "path": str(path), "content": text}
+        if previous[0] == digest:
+            return {"ok": True, "path": str(path), "unchanged": True}
+        diff = unified_diff(str(path), previous[1], text)
+        if len(diff) > len(text) * DIFF_MAX_RATIO:
+            return {"ok": True, "path": str(path), "content": text}
+        return {"ok": True, "path": str(path), "diff": diff}
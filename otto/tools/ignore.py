@@ -0,0 +1,137 @@
+"""Workspace ignore rules: built-in noise directories plus ``.gitignore`` files.
+
+This covers the common subset of gitignore syntax (globs where ``*`` and ``?``
+stay within one path segment, ``**`` across segments, anchored and
+directory-only patterns, ``!`` negation, nested ``.gitignore`` scoping). Walkers
+call :meth:`IgnoreRules.load_dir` when entering a directory and then ask
+:meth:`IgnoreRules.is_ignored` about its entries.
+"""
+
+import re
+from pathlib import Path
+from typing import List, Optional, Pattern, Set, Tuple
+
+
+DEFAULT_IGNORED_DIRS = frozenset({
+    ".git", ".hg", ".svn", ".otto", "node_modules", "__pycache__", ".venv", "venv",
+    ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", ".idea", ".eggs",
+    "dist", "build",
+})
+
+# (base dir relative to root, compiled pattern, negated, directory-only, anchored)
+_Rule = Tuple[str, Pattern[str], bool, bool, bool]
+
+
+def _translate(pattern: str) -> Pattern[str]:
+    """Compile a gitignore glob; unlike fnmatch, ``*`` and ``?`` never match ``/``."""
+    out: List[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("/**", i) and i + 3 == n:
+            out.append("/.*")
+            i += 3
+        elif pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+        elif c == "*":
+            out.append("[^/]*")
+            i += 1
+        elif c == "?":
+            out.append("[^/]")
+            i += 1
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern[i + 1 : i + 2] in ("!", "^") else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+                i += 1
+            else:
+                body = pattern[i + 1 : end]
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end + 1
+        elif c == "\\" and i + 1 < n:
+            out.append(re.escape(pattern[i + 1]))
+            i += 2
+        else:
+            out.append(re.escape(c))
+            i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+def find_repo_root(path: Path) -> Optional[Path]:
+    for candidate in (path, *path.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+class IgnoreRules:
+    def __init__(self, root: Path, use_gitignore: bool = True) -> None:
+        self.root = root.resolve()
+        self.use_gitignore = use_gitignore
+        self._rules: List[_Rule] = []
+        self._loaded: Set[str] = set()
+
+    @classmethod
+    def for_path(cls, path: Path, use_gitignore: bool = True) -> "IgnoreRules":
+        """Rules rooted at the enclosing git repository, with .gitignore files above ``path`` preloaded."""
+        path = path.resolve()
+        root = find_repo_root(path) or path
+        rules = cls(root, use_gitignore=use_gitignore)
+        for ancestor in reversed([path, *path.parents]):
+            if ancestor == root or root in ancestor.parents:
+                rules.load_dir(ancestor)
+        return rules
+
+    def rel(self, path: Path) -> str:
+        return path.resolve().relative_to(self.root).as_posix()
+
+    def load_dir(self, directory: Path) -> None:
+        if not self.use_gitignore:
+            return
+        base = self.rel(directory)
+        if base in self._loaded:
+            return
+        self._loaded.add(base)
+        base = "" if base == "." else base
+        try:
+            lines = (directory / ".gitignore").read_text(encoding="utf-8", errors="replace").splitlines()
+        except OSError:
+            return
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negated = line.startswith("!")
+            if negated:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                self._rules.append((base, _translate(line), negated, dir_only, anchored))
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        name = rel_path.rsplit("/", 1)[-1]
+        if is_dir and name in DEFAULT_IGNORED_DIRS:
+            return True
+        ignored = False
+        for base, pattern, negated, dir_only, anchored in self._rules:
+            if dir_only and not is_dir:
+                continue
+            if base:
+                if not rel_path.startswith(base + "/"):
+                    continue
+                sub = rel_path[len(base) + 1 :]
+            else:
+                sub = rel_path
+            matched = pattern.match(sub if anchored else name) is not None
+            if matched:
+                ignored = not negated
+        return ignored
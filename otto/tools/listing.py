@@ -0,0 +1,116 @@
+"""Recursive, ignore-aware directory listing rendered as a compact indented tree."""
+
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+from .ignore import IgnoreRules
+
+
+MAX_DEPTH = 8
+DEFAULT_MAX_ENTRIES = 50
+MAX_TOTAL_LINES = 2000
+
+
+def _human_size(size: int) -> str:
+    value = float(size)
+    for unit in ("B", "K", "M", "G"):
+        if value < 1024 or unit == "G":
+            return f"{int(value)}{unit}" if unit == "B" else f"{value:.1f}{unit}"
+        value /= 1024
+    return f"{size}B"
+
+
+def list_tree(
+    path: str = ".",
+    depth: int = 1,
+    show_sizes: bool = False,
+    show_mtimes: bool = False,
+    max_entries: int = DEFAULT_MAX_ENTRIES,
+    include_ignored: bool = False,
+) -> Dict[str, Any]:
+    """List ``path`` down to ``depth`` levels using one ``os.scandir`` pass per directory.
+
+    Directories end in ``/`` and are listed before files; each level is indented
+    by two spaces. Symlinks to directories are shown as ``name/ -> target`` and
+    are not descended into. At most ``max_entries`` entries are shown per directory, with a
+    ``... N more`` line for the remainder.
+    """
+    root = Path(path)
+    if not root.is_dir():
+        return {"ok": False, "error": f"not a directory: {path}"}
+    depth = max(1, min(int(depth), MAX_DEPTH))
+    max_entries = max(1, int(max_entries))
+    rules = None if include_ignored else IgnoreRules.for_path(root)
+
+    lines: List[str] = []
+    counts = {"dirs": 0, "files": 0, "omitted": 0}
+
+    def walk(directory: Path, level: int) -> None:
+        base = ""
+        if rules is not None:
+            rules.load_dir(directory)
+            base = rules.rel(directory)
+            base = "" if base == "." else base + "/"
+        try:
+            with os.scandir(directory) as it:
+                raw = list(it)
+        except OSError as e:
+            lines.append("  " * level + f"[error: {e.strerror or e}]")
+            return
+        dirs: List[Tuple[os.DirEntry, bool, bool]] = []
+        files: List[Tuple[os.DirEntry, bool, bool]] = []
+        for entry in raw:
+            try:
+                is_link = entry.is_symlink()
+                is_dir = entry.is_dir()
+            except OSError:
+                is_link = is_dir = False
+            if rules is not None and rules.is_ignored(base + entry.name, is_dir):
+                continue
+            (dirs if is_dir else files).append((entry, is_dir, is_link))
+        dirs.sort(key=lambda e: e[0].name)
+        files.sort(key=lambda e: e[0].name)
+        ordered = dirs + files
+        shown, hidden = ordered[:max_entries], len(ordered) - max_entries
+        indent = "  " * level
+        for entry, is_dir, is_link in shown:
+            if len(lines) >= MAX_TOTAL_LINES:
+                counts["omitted"] += 1
+                continue
+            line = indent + entry.name + ("/" if is_dir else "")
+            if is_dir and is_link:
+                try:
+                    line += " -> " + os.readlink(entry.path)
+                except OSError:
+                    pass
+            if (show_sizes and not is_dir) or show_mtimes:
+                try:
+                    st = entry.stat(follow_symlinks=False)
+                    if show_sizes and not is_dir:
+                        line += f"  {_human_size(st.st_size)}"
+                    if show_mtimes:
+                        line += "  " + time.strftime("%Y-%m-%d %H:%M", time.localtime(st.st_mtime))
+                except OSError:
+                    pass
+            lines.append(line)
+            if is_dir:
+                counts["dirs"] += 1
+                if level + 1 < depth and not is_link:
+                    walk(Path(entry.path), level + 1)
+            else:
+                counts["files"] += 1
+        if hidden > 0:
+            lines.append(indent + f"... {hidden} more")
+            counts["omitted"] += hidden
+
+    walk(root, 0)
+    return {
+        "ok": True,
+        "path": str(root),
+        "tree": "\n".join(lines),
+        "dirs": counts["dirs"],
+        "files": counts["files"],
+        "omitted": counts["omitted"],
+    }
@@ -2,9 +2,13 @@ import json
 import os
 import re
 import subprocess
-from dataclasses import dataclass
+from dataclasses import dataclass, field, replace
 from pathlib import Path
-from typing import Any, Dict, List
+from typing import Any, Callable, Dict, List, Optional
+
+from .code_search import codebase_search
+from .file_tracker import FileTracker
+from .listing import list_tree
 
 
 @dataclass
@@ -13,257 +17,382 @@ class ToolSpec:
     description: str
     parameters: Dict[str, Any]
 
-
-def get_tool_specs() -> List[Dict[str, Any]]:
-    return [
-        {
-            "type": "function",
-            "function": {
-                "name": "read_file",
-                "description": "Read a file slice or whole file.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "path": {"type": "string"},
-                        "start": {"type": "integer"},
-                        "end": {"type": "integer"},
-                    },
-                    "required": ["path"],
-                },
-            },
-        },
-        {
+    def to_openai(self) -> Dict[str, Any]:
+        return {
             "type": "function",
             "function": {
-                "name": "list_dir",
-                "description": "List directory entries.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {"path": {"type": "string"}},
-                    "required": ["path"],
-                },
+                "name": self.name,
+                "description": self.description,
+                "parameters": self.parameters,
             },
+        }
+
+
+@dataclass
+class ToolContext:
+    """Per-session state handed to every tool handler."""
+
+    file_tracker: FileTracker = field(default_factory=FileTracker)
+    # Filled in from the dispatched tool's metadata
+    timeout: Optional[float] = None
+
+
+@dataclass
+class ToolResult:
+    """Outcome of one tool call; serialized to a ``role: tool`` message only once, on demand."""
+
+    tool_call_id: Optional[str]
+    name: str
+    data: Optional[Dict[str, Any]] = None
+    _message: Optional[Dict[str, Any]] = field(default=None, repr=False)
+
+    @classmethod
+    def from_message(cls, message: Dict[str, Any]) -> "ToolResult":
+        """Wrap an already-serialized tool message, e.g. from a custom ``extra_tool_handlers`` entry."""
+        return cls(message.get("tool_call_id"), message.get("name") or "", None, message)
+
+    @property
+    def ok(self) -> bool:
+        return bool(self.data and self.data.get("ok"))
+
+    @property
+    def unknown_tool(self) -> bool:
+        return bool(self.data and self.data.get("unknown_tool"))
+
+    def to_message(self) -> Dict[str, Any]:
+        if self._message is None:
+            self._message = {
+                "role": "tool",
+                "tool_call_id": self.tool_call_id,
+                "name": self.name,
+                "content": json.dumps(self.data),
+            }
+        return self._message
+
+
+Handler = Callable[[Dict[str, Any], ToolContext], Dict[str, Any]]
+
+
+@dataclass
+class Tool:
+    """A registered tool and its metadata.
+
+    ``read_only`` tools do not modify the workspace. ``cacheable`` promises that the
+    result depends only on the arguments, not on filesystem or process state, so a
+    cache may reuse it; tools that read the workspace must leave it False.
+    """
+
+    spec: ToolSpec
+    handler: Handler
+    read_only: bool = False
+    cacheable: bool = False
+    timeout: Optional[float] = None
+
+
+class ToolRegistry:
+    def __init__(self) -> None:
+        self._tools: Dict[str, Tool] = {}
+        self._specs: Optional[List[Dict[str, Any]]] = None
+
+    def register(
+        self,
+        spec: ToolSpec,
+        handler: Handler,
+        *,
+        read_only: bool = False,
+        cacheable: bool = False,
+        timeout: Optional[float] = None,
+    ) -> Tool:
+        tool = Tool(spec, handler, read_only=read_only, cacheable=cacheable, timeout=timeout)
+        self._tools[spec.name] = tool
+        self._specs = None
+        return tool
+
+    def tool(self, name: str, description: str, parameters: Dict[str, Any], **meta: Any) -> Callable[[Handler], Handler]:
+        """Decorator form of :meth:`register`."""
+        def decorator(handler: Handler) -> Handler:
+            self.register(ToolSpec(name, description, parameters), handler, **meta)
+            return handler
+        return decorator
+
+    def get(self, name: str) -> Optional[Tool]:
+        return self._tools.get(name)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._tools
+
+    def names(self) -> List[str]:
+        return list(self._tools)
+
+    def specs(self) -> List[Dict[str, Any]]:
+        if self._specs is None:
+            self._specs = [t.spec.to_openai() for t in self._tools.values()]
+        return list(self._specs)
+
+    def copy(self) -> "ToolRegistry":
+        other = ToolRegistry()
+        other._tools = dict(self._tools)
+        return other
+
+    def dispatch(self, tool_call: Dict[str, Any], ctx: ToolContext) -> ToolResult:
+        fn = tool_call.get("function", {})
+        name = fn.get("name") or ""
+        tool = self._tools.get(name)
+        if tool is None:
+            # Unknown tool - return structured error that callers can detect
+            return ToolResult(tool_call.get("id"), name, {
+                "ok": False,
+                "error": f"Unknown tool '{name}'",
+                "unknown_tool": True,
+                "tool_name": name,
+                "available_tools": self.names(),
+            })
+        try:
+            args = json.loads(fn.get("arguments") or "{}")
+        except Exception:
+            args = {}
+        if not isinstance(args, dict):
+            args = {}
+        try:
+            data = tool.handler(args, replace(ctx, timeout=tool.timeout))
+        except Exception as e:
+            data = {"ok": False, "error": str(e)}
+        return ToolResult(tool_call.get("id"), name, data)
+
+
+DEFAULT_REGISTRY = ToolRegistry()
+_tool = DEFAULT_REGISTRY.tool
+
+
+@_tool(
+    "read_file",
+    "Read a file slice or whole file. Re-reading a whole file returns `unchanged` or a unified `diff` against the version you last saw; pass force_full to get the full contents.",
+    {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string"},
+            "start": {"type": "integer"},
+            "end": {"type": "integer"},
+            "force_full": {"type": "boolean"},
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "grep_search",
-                "description": "Exact regex search (ripgrep)",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "pattern": {"type": "string"},
-                        "path": {"type": "string"},
-                    },
-                    "required": ["pattern"],
-                },
-            },
+        "required": ["path"],
+    },
+    read_only=True,
+)
+def _read_file(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    path = Path(args.get("path", ""))
+    start = int(args.get("start") or 1)
+    end = int(args.get("end") or 0)
+    text = path.read_text(encoding="utf-8")
+    if end and end >= start:
+        lines = text.splitlines()
+        slice_ = lines[start - 1 : end]
+        return {"ok": True, "path": str(path), "content": "\n".join(slice_)}
+    return ctx.file_tracker.read(path, text, force_full=bool(args.get("force_full")))
+
+
+@_tool(
+    "list_dir",
+    "List a directory as an indented tree (dirs end in `/`). Use depth > 1 to map several levels in one call. Skips .gitignore'd and common build/cache directories unless include_ignored is set.",
+    {
+        "type": "object",
+        "properties": {
+            "path": {"type": "string"},
+            "depth": {"type": "integer", "description": "Levels to descend (default 1, max 8)."},
+            "show_sizes": {"type": "boolean"},
+            "show_mtimes": {"type": "boolean"},
+            "max_entries": {"type": "integer", "description": "Max entries shown per directory (default 50)."},
+            "include_ignored": {"type": "boolean"},
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "file_search",
-                "description": "Fuzzy file search by substring.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {"query": {"type": "string"}},
-                    "required": ["query"],
-                },
-            },
+        "required": ["path"],
+    },
+    read_only=True,
+)
+def _list_dir(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    return list_tree(
+        args.get("path") or ".",
+        depth=int(args.get("depth") or 1),
+        show_sizes=bool(args.get("show_sizes")),
+        show_mtimes=bool(args.get("show_mtimes")),
+        max_entries=int(args.get("max_entries") or 50),
+        include_ignored=bool(args.get("include_ignored")),
+    )
+
+
+@_tool(
+    "grep_search",
+    "Exact regex search (ripgrep)",
+    {
+        "type": "object",
+        "properties": {
+            "pattern": {"type": "string"},
+            "path": {"type": "string"},
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "edit_file",
-                "description": "Apply targeted edits using sentinel blocks.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "target_file": {"type": "string"},
-                        "instructions": {"type": "string"},
-                        "code_edit": {"type": "string"},
-                    },
-                    "required": ["target_file", "instructions", "code_edit"],
-                },
-            },
+        "required": ["pattern"],
+    },
+    read_only=True,
+    timeout=60,
+)
+def _grep_search(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    pattern = args.get("pattern", "")
+    search_path = args.get("path", ".")
+    if not pattern:
+        return {"ok": False, "error": "pattern required"}
+    # simple rg call
+    cmd = [
+        "rg",
+        "-n",
+        "--color=never",
+        pattern,
+        search_path,
+    ]
+    out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=ctx.timeout)
+    return {
+        "ok": out.returncode in (0,1),
+        "stdout": out.stdout,
+        "stderr": out.stderr,
+        "exit_code": out.returncode,
+    }
+
+
+@_tool(
+    "file_search",
+    "Fuzzy file search by substring.",
+    {
+        "type": "object",
+        "properties": {"query": {"type": "string"}},
+        "required": ["query"],
+    },
+    read_only=True,
+)
+def _file_search(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    query = args.get("query", "").lower()
+    hits: List[str] = []
+    for root, dirs, files in os.walk("."):
+        for f in files:
+            p = os.path.join(root, f)
+            rel = os.path.relpath(p, ".")
+            if query and query in rel.lower():
+                hits.append(rel)
+                if len(hits) >= 50:
+                    break
+    return {"ok": True, "results": hits}
+
+
+@_tool(
+    "codebase_search",
+    "Ranked lexical (BM25) search over workspace code chunks. Use natural-language or identifier queries; camelCase and snake_case identifiers are split into words.",
+    {
+        "type": "object",
+        "properties": {
+            "query": {"type": "string"},
+            "path": {"type": "string"},
+            "limit": {"type": "integer"},
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "delete_file",
-                "description": "Delete a file if it exists.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {"target_file": {"type": "string"}},
-                    "required": ["target_file"],
-                },
-            },
+        "required": ["query"],
+    },
+    read_only=True,
+)
+def _codebase_search(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    query = args.get("query", "")
+    if not query.strip():
+        return {"ok": False, "error": "query required"}
+    return codebase_search(query, args.get("path") or ".", int(args.get("limit") or 10))
+
+
+@_tool(
+    "edit_file",
+    "Apply targeted edits using sentinel blocks.",
+    {
+        "type": "object",
+        "properties": {
+            "target_file": {"type": "string"},
+            "instructions": {"type": "string"},
+            "code_edit": {"type": "string"},
         },
-        {
-            "type": "function",
-            "function": {
-                "name": "run_terminal_cmd",
-                "description": "Run a command non-interactively.",
-                "parameters": {
-                    "type": "object",
-                    "properties": {
-                        "command": {"type": "string"},
-                        "is_background": {"type": "boolean"},
-                    },
-                    "required": ["command", "is_background"],
-                },
-            },
+        "required": ["target_file", "instructions", "code_edit"],
+    },
+)
+def _edit_file(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    target = Path(args.get("target_file", ""))
+    code_edit = args.get("code_edit", "")
+    # naive apply: replace sentinel sections, keep exactly as provided
+    target.parent.mkdir(parents=True, exist_ok=True)
+    if "\n" not in code_edit and code_edit.strip() == "":
+        raise ValueError("empty code_edit")
+    # if the model provides full content, write it; otherwise append
+    if code_edit.strip().startswith("// ...") or "// ... existing code ..." in code_edit:
+        # for simplicity, write as-is to make the change explicit
+        existing = target.read_text(encoding="utf-8") if target.exists() else ""
+        merged = f"{existing}\n{code_edit}\n"
+        target.write_text(merged, encoding="utf-8")
+    else:
+        target.write_text(code_edit, encoding="utf-8")
+    # The agent's own writes are not external changes
+    ctx.file_tracker.record_disk(target)
+    return {"ok": True, "path": str(target)}
+
+
+@_tool(
+    "delete_file",
+    "Delete a file if it exists.",
+    {
+        "type": "object",
+        "properties": {"target_file": {"type": "string"}},
+        "required": ["target_file"],
+    },
+)
+def _delete_file(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    target = Path(args.get("target_file", ""))
+    if target.exists():
+        target.unlink()
+    ctx.file_tracker.forget(target)
+    return {"ok": True, "path": str(target)}
+
+
+@_tool(
+    "run_terminal_cmd",
+    "Run a command non-interactively.",
+    {
+        "type": "object",
+        "properties": {
+            "command": {"type": "string"},
+            "is_background": {"type": "boolean"},
         },
-    ]
+        "required": ["command", "is_background"],
+    },
+)
+def _run_terminal_cmd(args: Dict[str, Any], ctx: ToolContext) -> Dict[str, Any]:
+    cmd = args.get("command", "")
+    is_bg = bool(args.get("is_background"))
+    if not cmd:
+        return {"ok": False, "error": "command required"}
+    if is_bg:
+        p = subprocess.Popen(cmd, shell=True)
+        return {"ok": True, "pid": p.pid}
+    out = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, timeout=ctx.timeout)
+    return {
+        "ok": out.returncode == 0,
+        "stdout": out.stdout,
+        "stderr": out.stderr,
+        "exit_code": out.returncode,
+    }
+
+
+def get_tool_specs() -> List[Dict[str, Any]]:
+    return DEFAULT_REGISTRY.specs()
 
 
 def get_available_tool_names() -> List[str]:
     """Get a list of all available tool names."""
-    specs = get_tool_specs()
-    return [spec["function"]["name"] for spec in specs]
-
-
-def handle_tool_call(tool_call: Dict[str, Any]) -> Dict[str, Any]:
-    fn = tool_call.get("function", {})
-    name = fn.get("name")
-    args_raw = fn.get("arguments") or "{}"
-    try:
-        args = json.loads(args_raw)
-    except Exception:
-        args = {}
-
-    if name == "read_file":
-        path = Path(args.get("path", ""))
-        start = int(args.get("start") or 1)
-        end = int(args.get("end") or 0)
-        content = ""
-        try:
-            text = path.read_text(encoding="utf-8")
-            if end and end >= start:
-                lines = text.splitlines()
-                slice_ = lines[start - 1 : end]
-                content = "\n".join(slice_)
-            else:
-                content = text
-            result = {"ok": True, "path": str(path), "content": content}
-        except Exception as e:
-            result = {"ok": False, "error": str(e)}
-        return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
+    return DEFAULT_REGISTRY.names()
 
-    if name == "list_dir":
-        path = Path(args.get("path", "."))
-        try:
-            entries = [
-                (p.name + ("/" if p.is_dir() else ""))
-                for p in path.iterdir()
-            ]
-            result = {"ok": True, "path": str(path), "entries": entries}
-        except Exception as e:
-            result = {"ok": False, "error": str(e)}
-        return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
-
-    if name == "grep_search":
-        pattern = args.get("pattern", "")
-        search_path = args.get("path", ".")
-        if not pattern:
-            result = {"ok": False, "error": "pattern required"}
-        else:
-            try:
-                # simple rg call
-                cmd = [
-                    "rg",
-                    "-n",
-                    "--color=never",
-                    pattern,
-                    search_path,
-                ]
-                out = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                result = {
-                    "ok": out.returncode in (0,1),
-                    "stdout": out.stdout,
-                    "stderr": out.stderr,
-                    "exit_code": out.returncode,
-                }
-            except Exception as e:
-                result = {"ok": False, "error": str(e)}
-        return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
-
-    if name == "file_search":
-        query = args.get("query", "").lower()
-        hits: List[str] = []
-        for root, dirs, files in os.walk("."):
-            for f in files:
-                p = os.path.join(root, f)
-                rel = os.path.relpath(p, ".")
-                if query and query in rel.lower():
-                    hits.append(rel)
-                    if len(hits) >= 50:
-                        break
-        result = {"ok": True, "results": hits}
-        return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
-
-    if name == "edit_file":
-        target = Path(args.get("target_file", ""))
-        code_edit = args.get("code_edit", "")
-        try:
-            # naive apply: replace sentinel sections, keep exactly as provided
-            target.parent.mkdir(parents=True, exist_ok=True)
-            if "\n" not in code_edit and code_edit.strip() == "":
-                raise ValueError("empty code_edit")
-            # if the model provides full content, write it; otherwise append
-            if code_edit.strip().startswith("// ...") or "// ... existing code ..." in code_edit:
-                # for simplicity, write as-is to make the change explicit
-                existing = target.read_text(encoding="utf-8") if target.exists() else ""
-                merged = f"{existing}\n{code_edit}\n"
-                target.write_text(merged, encoding="utf-8")
-            else:
-                target.write_text(code_edit, encoding="utf-8")
-            result = {"ok": True, "path": str(target)}
-        except Exception as e:
-            result = {"ok": False, "error": str(e)}
-        return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
-
-    if name == "delete_file":
-        target = Path(args.get("target_file", ""))
-        try:
-            if target.exists():
-                target.unlink()
-            result = {"ok": True, "path": str(target)}
-        except Exception as e:
-            result = {"ok": False, "error": str(e)}
-        return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
-
-    if name == "run_terminal_cmd":
-        cmd = args.get("command", "")
-        is_bg = bool(args.get("is_background"))
-        if not cmd:
-            result = {"ok": False, "error": "command required"}
-        else:
-            try:
-                if is_bg:
-                    p = subprocess.Popen(cmd, shell=True)
-                    result = {"ok": True, "pid": p.pid}
-                else:
-                    out = subprocess.run(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                    result = {
-                        "ok": out.returncode == 0,
-                        "stdout": out.stdout,
-                        "stderr": out.stderr,
-                        "exit_code": out.returncode,
-                    }
-            except Exception as e:
-                result = {"ok": False, "error": str(e)}
-        return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
-
-    # Unknown tool - return structured error that CLI can detect
-    available_tools = get_available_tool_names()
-    result = {
-        "ok": False,
-        "error": f"Unknown tool '{name}'",
-        "unknown_tool": True,
-        "tool_name": name,
-        "available_tools": available_tools
-    }
-    return {"role": "tool", "tool_call_id": tool_call.get("id"), "name": name, "content": json.dumps(result)}
 
+def handle_tool_call(tool_call: Dict[str, Any], file_tracker: Optional[FileTracker] = None) -> Dict[str, Any]:
+    """Dispatch through the default registry and return the serialized ``role: tool`` message.
 
+    Without a ``file_tracker`` every call is stateless, so ``read_file`` always returns full
+    contents; pass the same tracker across a conversation to get unchanged/diff re-reads.
+    """
+    ctx = ToolContext(file_tracker=file_tracker) if file_tracker else ToolContext()
+    return DEFAULT_REGISTRY.dispatch(tool_call, ctx).to_message()
@@ -0,0 +1,89 @@
+"""Polling detection of files changed on disk since the agent last read or wrote them.
+
+Only files the agent has read or written are watched, so a poll is one ``stat``
+per tracked file; contents are hashed only when the stat changes. No inotify
+or other platform extras are needed.
+"""
+
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+from .file_tracker import FileTracker, disk_state, text_digest, unified_diff
+
+
+# Inline a change as a diff when it is at most this long; otherwise just name the file
+NOTICE_DIFF_MAX_CHARS = 1500
+NOTICE_MAX_FILES = 20
+
+
+@dataclass
+class FileChange:
+    path: str
+    status: str  # "modified" or "deleted"
+    diff: Optional[str] = None
+
+
+class ChangeWatcher:
+    def __init__(self, tracker: FileTracker, root: Optional[Path] = None) -> None:
+        self.tracker = tracker
+        self.root = (root or Path.cwd()).resolve()
+
+    def _label(self, key: str) -> str:
+        try:
+            return Path(key).relative_to(self.root).as_posix()
+        except ValueError:
+            return key
+
+    def poll(self) -> List[FileChange]:
+        """Report tracked files whose contents changed since the agent last read or wrote them."""
+        changes: List[FileChange] = []
+        for key, (mtime_ns, size, digest, racy) in self.tracker.disk_states():
+            try:
+                st = os.stat(key)
+            except FileNotFoundError:
+                self.tracker.forget(Path(key))
+                changes.append(FileChange(self._label(key), "deleted"))
+                continue
+            except OSError:
+                continue
+            if st.st_mtime_ns == mtime_ns and st.st_size == size and not racy:
+                continue
+            try:
+                text = Path(key).read_text(encoding="utf-8")
+            except (OSError, ValueError):
+                continue
+            new_digest = text_digest(text)
+            # Diff against what the agent itself last read or wrote, so its own edits are not reported
+            previous = self.tracker.disk_text(key)
+            self.tracker.set_disk_state(key, disk_state(st, new_digest), text)
+            if new_digest == digest:
+                # Touched but not changed
+                continue
+            change = FileChange(self._label(key), "modified")
+            if previous is not None:
+                diff = unified_diff(change.path, previous, text)
+                if diff and len(diff) <= NOTICE_DIFF_MAX_CHARS:
+                    change.diff = diff
+                    # The model now knows the new contents; a later read_file can say "unchanged"
+                    self.tracker.remember(Path(key), text)
+            changes.append(change)
+        return changes
+
+    def notice(self) -> Optional[str]:
+        """A compact message describing changed files, or None when nothing changed."""
+        changes = self.poll()
+        if not changes:
+            return None
+        lines = ["[workspace] Files changed on disk since you last read or wrote them:"]
+        for change in changes[:NOTICE_MAX_FILES]:
+            if change.diff:
+                lines.append(f"- {change.path} (modified):\n{change.diff.rstrip()}")
+            elif change.status == "modified":
+                lines.append(f"- {change.path} (modified; re-read before editing)")
+            else:
+                lines.append(f"- {change.path} (deleted)")
+        if len(changes) > NOTICE_MAX_FILES:
+            lines.append(f"- ... {len(changes) - NOTICE_MAX_FILES} more")
+        return "\n".join(lines)